@@ -0,0 +1,368 @@
+"""Shared banking core: database layer, tool logic, and request models.
+
+Everything here is entry-point agnostic so the FastAPI/MCP server (and
+any future entry point) imports one copy instead of maintaining its
+own. Keeping the Pydantic models here also means their validators are
+compiled once per interpreter.
+"""
+import asyncio
+import functools
+import logging
+import math
+from contextlib import asynccontextmanager
+
+import aiosqlite
+from pydantic import BaseModel
+
+# --- Configuration ---
+logger = logging.getLogger(__name__)
+
+DB_NAME = "bank.db"
+POOL_SIZE = 4
+
+# The bank's official policy handbook, searched by the /policies endpoint.
+BANK_POLICIES = {
+    "withdrawal_limit": "Daily limit is $500 (Basic) / $2,000 (Premium).",
+    "overdraft_fees": "Fee is $35 per transaction.",
+    "international": "Cost is $25 + 1% fee. Takes 3-5 days.",
+    "fraud": "Liability is $0 if reported in 24h.",
+    "support": "Live support 9-5 EST Mon-Fri."
+}
+# Precomputed once at import so searches do no per-request lowercasing.
+POLICY_INDEX = tuple(
+    (topic.upper(), topic.replace("_", " ").lower(), content.lower(), content)
+    for topic, content in BANK_POLICIES.items()
+)
+
+# --- Database Helpers ---
+# A small pool of long-lived aiosqlite connections, filled once at
+# startup. Handlers are async, so hundreds of concurrent requests
+# multiplex on the event loop instead of a bounded threadpool, and
+# reusing connections keeps SQLite's page cache warm.
+_pool: asyncio.Queue = None
+# SQLite allows only one writer at a time, so writers serialize here
+# instead of fighting over the database lock.
+_write_lock = asyncio.Lock()
+
+async def _connect():
+    """Open a new connection configured for pooled use."""
+    # isolation_level=None disables the driver's implicit transactions;
+    # write paths issue explicit BEGIN IMMEDIATE / COMMIT instead.
+    # cached_statements=256 keeps every hot query in the driver's
+    # prepared-statement LRU, so the parser/planner never runs in
+    # steady state.
+    conn = await aiosqlite.connect(DB_NAME, isolation_level=None, cached_statements=256)
+    # WAL lets readers run concurrently with a writer, and NORMAL batches
+    # fsyncs at checkpoints instead of syncing on every commit.
+    await conn.execute("PRAGMA journal_mode=WAL")
+    await conn.execute("PRAGMA synchronous=NORMAL")
+    await conn.execute("PRAGMA temp_store=MEMORY")
+    await conn.execute("PRAGMA cache_size=-64000")
+    return conn
+
+@asynccontextmanager
+async def db_connection(write: bool = False):
+    """Borrow a connection from the pool, returning it when done."""
+    if write:
+        await _write_lock.acquire()
+    conn = await _pool.get()
+    try:
+        yield conn
+    except Exception:
+        if conn.in_transaction:
+            await conn.rollback()
+        raise
+    finally:
+        _pool.put_nowait(conn)
+        if write:
+            _write_lock.release()
+
+async def close_pool():
+    """Close all pooled connections (called on shutdown)."""
+    while not _pool.empty():
+        await _pool.get_nowait().close()
+
+async def init_db():
+    """Initialize the connection pool and database tables."""
+    global _pool
+    _pool = asyncio.Queue(maxsize=POOL_SIZE)
+    for _ in range(POOL_SIZE):
+        _pool.put_nowait(await _connect())
+    async with db_connection(write=True) as conn:
+        cursor = await conn.execute("BEGIN IMMEDIATE")
+        await cursor.execute("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                balance INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        await cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_id INTEGER,
+                type TEXT,
+                amount INTEGER,
+                timestamp TEXT,
+                FOREIGN KEY(account_id) REFERENCES accounts(id)
+            )
+        """)
+        # Composite index so history lookups are an index seek plus a short
+        # reverse scan instead of a full table scan over all transactions.
+        await cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tx_acct_id
+            ON transactions(account_id, id DESC)
+        """)
+        await cursor.execute("COMMIT")
+
+# Building the timestamp inside SQLite keeps the string construction in C
+# and saves a Python allocation per logged transaction.
+SQL_TIMESTAMP = "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')"
+
+# Hot statements as module constants: one source of truth for the
+# queries the indexes have to serve, and each string is prepared once
+# and then reused from the connection's statement cache.
+SQL_INSERT_LOG = (
+    f"INSERT INTO transactions (account_id, type, amount, timestamp) "
+    f"VALUES (?, ?, ?, {SQL_TIMESTAMP})"
+)
+SQL_INSERT_LOG_PAIR = (
+    f"INSERT INTO transactions (account_id, type, amount, timestamp) "
+    f"VALUES (?, ?, ?, {SQL_TIMESTAMP}), (?, ?, ?, {SQL_TIMESTAMP})"
+)
+SQL_INSERT_ACCOUNT = "INSERT INTO accounts (name, balance) VALUES (?, ?)"
+SQL_GET_BALANCE = "SELECT name, balance FROM accounts WHERE id = ?"
+SQL_ACCOUNT_EXISTS = "SELECT id FROM accounts WHERE id = ?"
+SQL_UPDATE_BAL_DELTA = "UPDATE accounts SET balance = balance + ? WHERE id = ?"
+SQL_WITHDRAW = (
+    "UPDATE accounts SET balance = balance - ? "
+    "WHERE id = ? AND balance >= ? RETURNING balance"
+)
+SQL_TRANSFER = """UPDATE accounts
+                   SET balance = balance + CASE id WHEN ? THEN -? ELSE ? END
+                   WHERE id IN (?, ?) AND (id != ? OR balance >= ?)"""
+SQL_HISTORY = (
+    "SELECT type, amount, timestamp FROM transactions "
+    "WHERE account_id = ? ORDER BY id DESC LIMIT ?"
+)
+
+# Money is stored as integer cents: exact comparisons (no IEEE-754
+# fuzz in `balance >= ?`), smaller rows, and integer arithmetic inside
+# SQLite. Floats exist only at the API boundary.
+
+# Largest dollar amount any single request may move; keeps cents well
+# inside SQLite's 64-bit integer range.
+MAX_AMOUNT = 10**12
+
+def to_cents(amount: float) -> int:
+    """Convert a dollar amount from the API into integer cents.
+
+    Every money path funnels through here, so this is also where
+    non-finite (NaN/infinity) and absurdly large inputs are rejected
+    before they can overflow round().
+    """
+    if not math.isfinite(amount):
+        raise ValueError("Amount must be a finite number.")
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"Amount must not exceed ${MAX_AMOUNT:,}.")
+    return round(amount * 100)
+
+def to_dollars(cents: int) -> float:
+    """Convert stored cents back into dollars for responses."""
+    return cents / 100
+
+async def log_transaction(cursor, account_id, trans_type, amount):
+    """Helper to log transactions (must be called inside an existing transaction)."""
+    await cursor.execute(SQL_INSERT_LOG, (account_id, trans_type, amount))
+
+# --- Core Tool Logic ---
+# Plain async functions; the server registers them as MCP tools and
+# calls them directly from the HTTP endpoints.
+
+async def create_account_tool(name: str, initial_deposit: float = 0.0) -> dict:
+    """Create a new account and return the ID."""
+    # Reject nonsense input before borrowing a connection or taking
+    # the writer lock.
+    name = name.strip()
+    if not name:
+        raise ValueError("Name must not be empty.")
+    cents = to_cents(initial_deposit)
+    if cents < 0:
+        raise ValueError("Initial deposit cannot be negative.")
+
+    async with db_connection(write=True) as conn:
+        cursor = await conn.execute("BEGIN IMMEDIATE")
+        await cursor.execute(SQL_INSERT_ACCOUNT, (name, cents))
+        account_id = cursor.lastrowid
+        if cents > 0:
+            await log_transaction(cursor, account_id, "DEPOSIT", cents)
+        await cursor.execute("COMMIT")
+    return {"message": "Account created", "account_id": account_id}
+
+async def deposit_tool(account_id: int, amount: float) -> str:
+    """Add funds to an account."""
+    cents = to_cents(amount)
+    if cents <= 0:
+        raise ValueError("Amount must be positive.")
+
+    async with db_connection(write=True) as conn:
+        cursor = await conn.execute("BEGIN IMMEDIATE")
+        # No pre-check SELECT: zero rows updated means the account
+        # doesn't exist, so the UPDATE doubles as the existence check.
+        await cursor.execute(SQL_UPDATE_BAL_DELTA, (cents, account_id))
+        if cursor.rowcount == 0:
+            raise ValueError("Account not found.")
+
+        await log_transaction(cursor, account_id, "DEPOSIT", cents)
+        await cursor.execute("COMMIT")
+    return f"Deposited ${amount} successfully."
+
+async def withdraw_tool(account_id: int, amount: float) -> str:
+    """Deduct funds from an account."""
+    cents = to_cents(amount)
+    if cents <= 0:
+        raise ValueError("Amount must be positive.")
+
+    async with db_connection(write=True) as conn:
+        cursor = await conn.execute("BEGIN IMMEDIATE")
+        # One statement checks existence, guards the balance, and applies
+        # the debit; RETURNING hands back the new balance without a
+        # separate SELECT round-trip.
+        await cursor.execute(SQL_WITHDRAW, (cents, account_id, cents))
+        if await cursor.fetchone() is None:
+            # Failure path only: work out which precondition failed.
+            await cursor.execute(SQL_ACCOUNT_EXISTS, (account_id,))
+            if not await cursor.fetchone():
+                raise ValueError("Account not found.")
+            raise ValueError("Insufficient funds.")
+
+        await log_transaction(cursor, account_id, "WITHDRAWAL", cents)
+        await cursor.execute("COMMIT")
+    return f"Withdrew ${amount} successfully."
+
+async def transfer_tool(from_id: int, to_id: int, amount: float) -> str:
+    """Securely transfer funds between accounts."""
+    # A self-transfer is a no-op that would still consume the writer
+    # lock, and the CASE in SQL_TRANSFER only debits when both ids hit
+    # the same row — reject it before touching the pool.
+    if from_id == to_id:
+        raise ValueError("Sender and receiver must differ.")
+    cents = to_cents(amount)
+    if cents <= 0:
+        raise ValueError("Amount must be positive.")
+
+    async with db_connection(write=True) as conn:
+        cursor = await conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Grab the writer lock once, then move the money with a single
+            # UPDATE: the CASE debits the sender and credits the receiver,
+            # and the balance predicate guards against overdrafts. Both rows
+            # updating means both accounts existed and funds were sufficient.
+            await cursor.execute(
+                SQL_TRANSFER,
+                (from_id, cents, cents, from_id, to_id, from_id, cents)
+            )
+            if cursor.rowcount != 2:
+                # Slow path only on failure: work out which check failed.
+                await cursor.execute("ROLLBACK")
+                await cursor.execute("SELECT balance FROM accounts WHERE id = ?", (from_id,))
+                sender = await cursor.fetchone()
+                if not sender: raise ValueError("Sender account not found.")
+                if sender[0] < cents: raise ValueError("Insufficient funds.")
+                await cursor.execute(SQL_ACCOUNT_EXISTS, (to_id,))
+                if not await cursor.fetchone(): raise ValueError("Receiver account not found.")
+                raise ValueError("Transfer could not be applied.")
+
+            # Log both legs with one multi-row INSERT.
+            await cursor.execute(
+                SQL_INSERT_LOG_PAIR,
+                (from_id, "TRANSFER_OUT", cents, to_id, "TRANSFER_IN", cents)
+            )
+            await cursor.execute("COMMIT")
+            # %s-style args so formatting is skipped when DEBUG is off.
+            logger.debug("transfer %s -> %s amount %s", from_id, to_id, amount)
+        except Exception as e:
+            if conn.in_transaction:
+                await conn.rollback()
+            raise e
+
+    return f"Transferred ${amount} from {from_id} to {to_id}."
+
+async def get_balance_tool(account_id: int) -> dict:
+    """Get the current balance."""
+    async with db_connection() as conn:
+        cursor = await conn.execute(SQL_GET_BALANCE, (account_id,))
+        res = await cursor.fetchone()
+
+    if not res:
+        raise ValueError("Account not found.")
+    return {"account": res[0], "balance": to_dollars(res[1])}
+
+async def batch_deposit_tool(items: list) -> dict:
+    """Deposit into many accounts in one transaction (e.g. payroll runs).
+
+    Each item is a (account_id, amount) pair. All deposits commit
+    together or not at all, so N separate fsyncs collapse into one.
+    """
+    if not items:
+        raise ValueError("No deposits provided.")
+    deposits = [(account_id, to_cents(amount)) for account_id, amount in items]
+    for account_id, cents in deposits:
+        if cents <= 0:
+            raise ValueError(f"Amount must be positive for account {account_id}.")
+
+    async with db_connection(write=True) as conn:
+        cursor = await conn.execute("BEGIN IMMEDIATE")
+        await cursor.executemany(
+            SQL_UPDATE_BAL_DELTA,
+            [(cents, account_id) for account_id, cents in deposits]
+        )
+        if cursor.rowcount != len(deposits):
+            raise ValueError("One or more accounts not found.")
+        await cursor.executemany(
+            SQL_INSERT_LOG,
+            [(account_id, "DEPOSIT", cents) for account_id, cents in deposits]
+        )
+        await cursor.execute("COMMIT")
+    return {"message": f"Deposited into {len(items)} accounts.", "count": len(items)}
+
+async def get_transaction_history_tool(account_id: int, limit: int = 10) -> list:
+    """Get the most recent transactions for an account."""
+    async with db_connection() as conn:
+        cursor = await conn.execute(SQL_HISTORY, (account_id, limit))
+        rows = await cursor.fetchall()
+    return [{"type": r[0], "amount": to_dollars(r[1]), "timestamp": r[2]} for r in rows]
+
+@functools.lru_cache(maxsize=512)
+def _policy_search(query: str) -> tuple:
+    """Scan the policy index, memoizing results per normalized query.
+
+    Returns an immutable tuple of (topic, content) pairs so cached
+    entries can never be mutated by callers.
+    """
+    return tuple(
+        (topic_upper, content)
+        for topic_upper, topic_lower, content_lower, content in POLICY_INDEX
+        if query in topic_lower or query in content_lower
+    )
+
+def get_policy_tool(query: str) -> list:
+    """Search the banking policy handbook."""
+    return [{"topic": topic, "content": content} for topic, content in _policy_search(query.lower())]
+
+# --- Request Models ---
+
+class AccountCreate(BaseModel):
+    name: str
+    initial_deposit: float = 0.0
+
+class TransactionRequest(BaseModel):
+    amount: float
+
+class TransferRequest(BaseModel):
+    from_account_id: int
+    to_account_id: int
+    amount: float
+
+class BatchDepositRequest(BaseModel):
+    items: list[tuple[int, float]]